@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from fake_github import FakeGitHub
+from fake_trac import FakeTrac
+from synthetic_corpus import Corpus
+
+'''
+End-to-end throughput benchmark of the migration scripts against local fake
+Trac and GitHub servers filled with a synthetic corpus.
+
+Every target runs in its own process so its peak RSS is measured alone:
+  issues      : migration_issues.Migrator.run
+  wiki        : export_wiki.export_pages (main without the pandoc/git script)
+  attachments : export_wiki_attachments.main
+
+Examples:
+  python benchmark.py --tickets 20000 --pages 5000
+  python benchmark.py --targets issues --github-latency 0.05 --rate-limit 1000 --rate-limit-window 10
+  python benchmark.py --serve   # only run the servers
+'''
+
+TARGETS = ['issues', 'wiki', 'attachments']
+
+GITHUB_ORGANISATION = "SasView"
+
+
+def run_target(target, output_directory):
+    '''
+    Runs a target in this process (the benchmark child)
+    @returns number of tickets or pages processed, None if not known here
+    '''
+    if target == 'issues':
+        import migration_issues
+        m = migration_issues.Migrator()
+        m.run()
+        return sum(len(i) for i in m.trac_issue_map.values())
+    elif target == 'wiki':
+        import export_wiki
+        export_wiki.OUTPUT_DIRECTORY = output_directory
+        return len(export_wiki.export_pages())
+    elif target == 'attachments':
+        import export_wiki_attachments
+        export_wiki_attachments.OUTPUT_DIRECTORY = output_directory
+        export_wiki_attachments.main()
+        return None
+    raise ValueError('Unknown target: {}'.format(target))
+
+
+def child_main(args):
+    ''' Runs a single target and writes elapsed time and peak RSS as JSON '''
+    ts = time.time()
+    items = run_target(args.run_target, args.output_directory)
+    te = time.time()
+    result = {
+        'items': items,
+        'elapsed': te - ts,
+        # kB on Linux
+        'max_rss': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'children_max_rss': resource.getrusage(
+            resource.RUSAGE_CHILDREN).ru_maxrss,
+    }
+    with open(args.result_file, 'w') as f:
+        json.dump(result, f)
+
+
+def benchmark(target, trac, github, seconds_between_requests=0.0,
+              seconds_between_writes=0.0, verbose=False):
+    '''
+    Runs the target in a child process against the fake servers.
+    PyGithub waits seconds_between_requests/writes between requests.
+    '''
+    trac.reset_counters()
+    github.reset_counters()
+    env = dict(os.environ, **{
+        "TRAC-URL": trac.url,
+        "GITHUB-API-URL": github.url,
+        "GITHUB-ORGANISATION": GITHUB_ORGANISATION,
+        "GITHUB-TOKENS": repr({'sasview-bot': 'fake-token'}),
+        "GITHUB-SECONDS-BETWEEN-REQUESTS": str(seconds_between_requests),
+        "GITHUB-SECONDS-BETWEEN-WRITES": str(seconds_between_writes),
+    })
+    with tempfile.TemporaryDirectory() as output_directory:
+        result_file = os.path.join(output_directory, 'result.json')
+        command = [sys.executable, os.path.realpath(__file__),
+                   '--run-target', target,
+                   '--output-directory', os.path.join(output_directory, 'out'),
+                   '--result-file', result_file]
+        output = None if verbose else subprocess.DEVNULL
+        subprocess.run(command, env=env, stdout=output, check=True)
+        with open(result_file) as f:
+            result = json.load(f)
+    if result['items'] is None:
+        result['items'] = len(trac.corpus.pages)
+    result.update({
+        'target': target,
+        'rate': result['items'] / result['elapsed'] if result['elapsed'] else 0,
+        'trac_requests': trac.requests,
+        'trac_calls': sum(trac.calls.values()),
+        'github_requests': github.requests,
+        'github_rate_limited': github.rate_limited,
+    })
+    return result
+
+
+def print_results(results):
+    print("{:<12} {:>8} {:>9} {:>12} {:>10} {:>10} {:>10} {:>9} {:>10}".format(
+        'target', 'items', 'time (s)', 'items/s', 'trac req', 'trac calls',
+        'gh req', 'gh 403', 'RSS (MiB)'))
+    for r in results:
+        unit = 'tickets/s' if r['target'] == 'issues' else 'pages/s'
+        print("{:<12} {:>8} {:>9.2f} {:>12} {:>10} {:>10} {:>10} {:>9} {:>10.1f}".format(
+            r['target'], r['items'], r['elapsed'],
+            '{:.1f} {}'.format(r['rate'], unit.split('/')[0][0]),
+            r['trac_requests'], r['trac_calls'], r['github_requests'],
+            r['github_rate_limited'],
+            max(r['max_rss'], r['children_max_rss']) / 1024))
+    print("items/s: t = tickets/s, p = pages/s. "
+          "RSS: peak of the target process or its largest worker.")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Throughput benchmark of the migration scripts')
+    parser.add_argument('--targets', nargs='+', choices=TARGETS, default=TARGETS)
+    parser.add_argument('--tickets', type=int, default=1000)
+    parser.add_argument('--pages', type=int, default=200)
+    parser.add_argument('--changes-per-ticket', type=int, default=4)
+    parser.add_argument('--attachments-per-page', type=float, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--trac-latency', type=float, default=0.0,
+                        help='seconds per Trac request')
+    parser.add_argument('--github-latency', type=float, default=0.0,
+                        help='seconds per GitHub request')
+    parser.add_argument('--rate-limit', type=int, default=None,
+                        help='GitHub requests per --rate-limit-window')
+    parser.add_argument('--rate-limit-window', type=float, default=10.0,
+                        help='seconds; PyGithub waits until the window ends '
+                             'after a 403')
+    parser.add_argument('--seconds-between-requests', type=float, default=0.0,
+                        help='PyGithub throttling (0.25 s against GitHub)')
+    parser.add_argument('--seconds-between-writes', type=float, default=0.0,
+                        help='PyGithub throttling (1 s against GitHub)')
+    parser.add_argument('--json', help='also write the results to this file')
+    parser.add_argument('--serve', action='store_true',
+                        help='only start the fake servers and wait')
+    parser.add_argument('--verbose', action='store_true',
+                        help='show the output of the targets')
+    # Used internally to run a target in the child process
+    parser.add_argument('--run-target', help=argparse.SUPPRESS)
+    parser.add_argument('--output-directory', help=argparse.SUPPRESS)
+    parser.add_argument('--result-file', help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.run_target:
+        child_main(args)
+        return
+
+    ts = time.time()
+    corpus = Corpus(tickets=args.tickets, pages=args.pages,
+                    changes_per_ticket=args.changes_per_ticket,
+                    attachments_per_page=args.attachments_per_page,
+                    seed=args.seed)
+    print("Corpus: {} tickets, {} pages, {} attachments ({:.2f} s).".format(
+        len(corpus.tickets), len(corpus.pages), len(corpus.attachments),
+        time.time() - ts))
+
+    trac = FakeTrac(corpus, latency=args.trac_latency).start()
+    github = FakeGitHub(latency=args.github_latency, rate_limit=args.rate_limit,
+                        rate_limit_window=args.rate_limit_window).start()
+    try:
+        if args.serve:
+            print("TRAC-URL={}".format(trac.url))
+            print("GITHUB-API-URL={}".format(github.url))
+            print("GITHUB-ORGANISATION={}".format(GITHUB_ORGANISATION))
+            print("Press Ctrl+C to stop.")
+            while True:
+                time.sleep(3600)
+
+        results = []
+        for target in args.targets:
+            print("Running {}...".format(target))
+            results.append(benchmark(
+                target, trac, github, args.seconds_between_requests,
+                args.seconds_between_writes, args.verbose))
+        print_results(results)
+        if args.json:
+            with open(args.json, 'w') as f:
+                json.dump(results, f, indent=4)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        trac.stop()
+        github.stop()
+
+
+if __name__ == "__main__":
+    main()
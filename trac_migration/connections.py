@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import ast
+import os
+import threading
+import urllib.parse
+import xmlrpc.client
+
+from dotenv import load_dotenv
+
+'''
+Configuration and connections shared by the migration scripts.
+
+The .env file is loaded once, GITHUB-TOKENS is parsed once and the Trac and
+GitHub clients are created on first use and then reused. ServerProxy is not
+thread safe and sockets must not be shared with forked workers, so the
+clients are kept per process and, for Trac, per thread.
+PyGithub is only imported when a GitHub client is needed.
+'''
+
+DEFAULT_GITHUB_USERNAME = "sasview-bot"
+
+DEFAULT_GITHUB_API_URL = "https://api.github.com"
+
+TRAC_RPC_PATH = 'login/xmlrpc'
+
+# load .env file
+load_dotenv()
+
+_thread_data = threading.local()
+_lock = threading.Lock()
+# pid : token : Github
+_github_clients = {}
+# pid : (token, organisation name) : Organization
+_github_organisations = {}
+_github_tokens = None
+
+
+def get_trac():
+    ''' ServerProxy of Trac for the current process and thread '''
+    trac = getattr(_thread_data, 'trac', None)
+    if trac is None or _thread_data.pid != os.getpid():
+        trac_url = os.getenv("TRAC-URL")
+        rpc_url = urllib.parse.urljoin(trac_url, TRAC_RPC_PATH)
+        trac = xmlrpc.client.ServerProxy(rpc_url)
+        _thread_data.trac = trac
+        _thread_data.pid = os.getpid()
+    return trac
+
+
+def get_github_tokens():
+    ''' GITHUB-TOKENS as a dict github username : token '''
+    global _github_tokens
+    if _github_tokens is None:
+        _github_tokens = ast.literal_eval(os.getenv("GITHUB-TOKENS"))
+    return _github_tokens
+
+
+def get_github_token(github_username=DEFAULT_GITHUB_USERNAME):
+    ''' Token of github_username or of DEFAULT_GITHUB_USERNAME if there is
+    no token for it '''
+    tokens = get_github_tokens()
+    github_username = github_username.strip()
+    if github_username not in tokens:
+        github_username = DEFAULT_GITHUB_USERNAME
+    return tokens[github_username]
+
+
+def get_github(github_username=DEFAULT_GITHUB_USERNAME):
+    '''
+    Github client authenticated with the token of github_username.
+    GITHUB-SECONDS-BETWEEN-REQUESTS and GITHUB-SECONDS-BETWEEN-WRITES, if
+    set, replace the PyGithub throttling (0.25 s and 1 s by default).
+    '''
+    from github import Github
+
+    token = get_github_token(github_username)
+    kwargs = {}
+    for key, variable in [
+            ('seconds_between_requests', "GITHUB-SECONDS-BETWEEN-REQUESTS"),
+            ('seconds_between_writes', "GITHUB-SECONDS-BETWEEN-WRITES")]:
+        if os.getenv(variable):
+            kwargs[key] = float(os.getenv(variable))
+    with _lock:
+        clients = _github_clients.setdefault(os.getpid(), {})
+        if token not in clients:
+            clients[token] = Github(token, base_url=os.getenv(
+                "GITHUB-API-URL", DEFAULT_GITHUB_API_URL), **kwargs)
+        return clients[token]
+
+
+def get_github_organisation(github_username=DEFAULT_GITHUB_USERNAME):
+    ''' GITHUB-ORGANISATION seen by github_username '''
+    organisation_name = os.getenv("GITHUB-ORGANISATION")
+    key = (get_github_token(github_username), organisation_name)
+    github = get_github(github_username)
+    with _lock:
+        organisations = _github_organisations.setdefault(os.getpid(), {})
+        if key not in organisations:
+            organisations[key] = github.get_organization(organisation_name)
+        return organisations[key]
@@ -2,23 +2,17 @@
 # -*- coding: utf-8 -*-
 
 import os
-import random
 import re
-import shlex
 import subprocess
 import tempfile
-import time
-import urllib.parse
-import xmlrpc.client
 from datetime import datetime, timezone
 from multiprocessing import Pool
 
 import bleach
 from bleach.sanitizer import Cleaner
-from bs4 import BeautifulSoup, Comment
-from dotenv import load_dotenv
-from github import Github
-from lxml.html import clean
+from bs4 import BeautifulSoup
+
+from connections import get_github_organisation, get_trac
 
 '''
 Migrates trac wiki to github
@@ -30,9 +24,7 @@ NUMBER_OF_CORES = 7
 OUTPUT_DIRECTORY = os.path.join(
     os.path.dirname(os.path.realpath(__file__)), "out")
 
-DEFAULT_GITHUB_USERNAME = "sasview-bot"
-
-SCRIPT = '''#!/bin/bash
+SCRIPT_TEMPLATE = '''#!/bin/bash
 cd {out_directory}
 echo {out_directory}
 for f in *.html; do
@@ -55,15 +47,17 @@ git add .
 git commit -m "Added MD script {date_now}"
 git push
 cd {cwd}
-'''.format(**dict(
-    out_directory=OUTPUT_DIRECTORY,
-    date_now=datetime.now(timezone.utc).isoformat(),
-    wiki_repo="/home/rhf/git/sasview_wiki",
-    cwd=os.path.dirname(os.path.realpath(__file__)),
-))
+'''
 
-# load .env file
-load_dotenv()
+
+def make_script():
+    ''' Script converting the pages in OUTPUT_DIRECTORY to md and pushing them '''
+    return SCRIPT_TEMPLATE.format(**dict(
+        out_directory=OUTPUT_DIRECTORY,
+        date_now=datetime.now(timezone.utc).isoformat(),
+        wiki_repo="/home/rhf/git/sasview_wiki",
+        cwd=os.path.dirname(os.path.realpath(__file__)),
+    ))
 
 
 def update_issues_map():
@@ -72,11 +66,7 @@ def update_issues_map():
     [ticket number] = (repo name, issue_number)
     '''
 
-    github_username = DEFAULT_GITHUB_USERNAME
-    GITHUB_TOKENS = eval(os.getenv("GITHUB-TOKENS"))
-    token = GITHUB_TOKENS[github_username]
-    github = Github(token)
-    github_org = github.get_organization(os.getenv("GITHUB-ORGANISATION"))
+    github_org = get_github_organisation()
 
     repos = ["sasview", 'sasmodels', 'sasmodel-marketplace']
     issues_map = {}
@@ -90,7 +80,16 @@ def update_issues_map():
     return issues_map
 
 
-issues_map = update_issues_map()
+# Set by get_issues_map() before the workers are forked
+issues_map = None
+
+
+def get_issues_map():
+    ''' update_issues_map() only the first time '''
+    global issues_map
+    if issues_map is None:
+        issues_map = update_issues_map()
+    return issues_map
 
 
 def update_ticket_link_to_gh_issues(text):
@@ -109,7 +108,7 @@ def update_ticket_link_to_gh_issues(text):
         group 3 = Description of the link
         '''
 
-        repo_name, issue_number = issues_map.get(
+        repo_name, issue_number = get_issues_map().get(
             int(match.group(2)), (None, None))
         # To every found <a> this is the substitution link
         if match.group(3).startswith('#') or "trac.sasview.org" in match.group(3):
@@ -160,11 +159,8 @@ def process_single_file(page):
     dir = os.path.dirname(filename)
     dir and os.makedirs(dir, exist_ok=True)
 
-    trac_url = os.getenv("TRAC-URL")
-    rpc_url = urllib.parse.urljoin(trac_url, 'login/xmlrpc')
-    trac = xmlrpc.client.ServerProxy(rpc_url)
     # doc is a string
-    doc = trac.wiki.getPageHTML(page)
+    doc = get_trac().wiki.getPageHTML(page)
 
     # Write a copy of the original
     with open(filename.replace(".html", "_orig.html"), 'w') as f2:
@@ -201,18 +197,22 @@ def process_single_file(page):
         f.write(doc)
 
 
-def main():
-    trac_url = os.getenv("TRAC-URL")
-    rpc_url = urllib.parse.urljoin(trac_url, 'login/xmlrpc')
-    trac = xmlrpc.client.ServerProxy(rpc_url)
+def export_pages():
+    ''' Saves the sanitised HTML of all wiki pages in OUTPUT_DIRECTORY '''
+    get_issues_map()
 
-    pages = list(trac.wiki.getAllPages())
+    pages = list(get_trac().wiki.getAllPages())
     with Pool(NUMBER_OF_CORES) as p:
         p.map(process_single_file, pages)
+    return pages
+
+
+def main():
+    export_pages()
 
     # script to convert html to md and update github
     with tempfile.NamedTemporaryFile() as fp:
-        fp.write(SCRIPT.encode('ascii'))
+        fp.write(make_script().encode('ascii'))
         fp.flush()
         proc = subprocess.run(['/bin/bash', fp.name],
                               stdout=subprocess.PIPE, stderr=subprocess.PIPE)
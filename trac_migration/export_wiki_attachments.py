@@ -1,57 +1,266 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import hashlib
+import http.client
+import json
 import os
-import random
-import re
-import shlex
-import time
+import shutil
+import tempfile
+import threading
+import urllib.error
 import urllib.parse
+import urllib.request
 import xmlrpc.client
-from base64 import b64decode
-from multiprocessing import Pool
+from base64 import b64encode
+from collections import Counter
+from multiprocessing.pool import ThreadPool
 
-import bleach
-import pypandoc
-from bleach.sanitizer import Cleaner
-from bs4 import BeautifulSoup, Comment
-from dotenv import load_dotenv
-from github import Github
-from lxml.html import clean
+from connections import get_trac
 
 '''
 This script only downloads the attachements of the wiki
+
+Attachments are downloaded in parallel. Files already downloaded in a
+previous run (same size and hash) are skipped and the same content attached
+to several pages is stored only once and hard linked.
 '''
 
 OUTPUT_DIRECTORY = "attachs"
 
-# load .env file
-load_dotenv()
+# Number of attachments downloaded at the same time
+NUMBER_OF_WORKERS = 8
 
+# Number of pages per wiki.listAttachments MultiCall
+LISTING_BATCH_SIZE = 100
+
+# Attachments bigger than this (bytes) are streamed to disk from the
+# raw-attachment endpoint instead of wiki.getAttachment
+STREAM_THRESHOLD = 1024 * 1024
+
+CHUNK_SIZE = 64 * 1024
+
+# Inside OUTPUT_DIRECTORY: content addressed copies and what was downloaded
+OBJECTS_DIRECTORY = ".objects"
+MANIFEST_FILENAME = ".manifest.json"
+
+
+def file_sha256(filename):
+    ''' sha256 hex digest of a file read in chunks '''
+    sha256 = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            sha256.update(chunk)
+    return sha256.hexdigest()
 
-def main():
 
+def attachment_filename(attachment):
+    ''' Local file name of an attachment: page/sub/file.png -> page_sub_file.png '''
+    filename = f'{attachment}'.lstrip('/')
+    filename = filename.replace('/', '_')
+    return os.path.join(OUTPUT_DIRECTORY, filename)
+
+
+def raw_attachment_request(attachment, method='GET'):
+    '''
+    Request for the raw-attachment endpoint of an attachment.
+    The USERNAME:PASSWORD of TRAC-URL are sent as basic authentication.
+    '''
     trac_url = os.getenv("TRAC-URL")
-    rpc_url = urllib.parse.urljoin(trac_url, 'login/xmlrpc')
-    trac = xmlrpc.client.ServerProxy(rpc_url)
+    scheme, netloc, path, _, _ = urllib.parse.urlsplit(trac_url)
+    headers = {}
+    if '@' in netloc:
+        credentials, netloc = netloc.rsplit('@', 1)
+        headers['Authorization'] = 'Basic ' + b64encode(
+            urllib.parse.unquote(credentials).encode('utf-8')).decode('ascii')
+    path = '{}/raw-attachment/wiki/{}'.format(
+        path.rstrip('/'), urllib.parse.quote(attachment.lstrip('/')))
+    url = urllib.parse.urlunsplit((scheme, netloc, path, '', ''))
+    return urllib.request.Request(url, headers=headers, method=method)
+
+
+def get_remote_size(attachment):
+    ''' Size of the attachment in the server or None if unknown '''
+    try:
+        with urllib.request.urlopen(raw_attachment_request(attachment, 'HEAD')) as r:
+            size = r.headers.get('Content-Length')
+        return int(size) if size is not None else None
+    except (OSError, http.client.HTTPException, ValueError):
+        return None
+
+
+def list_all_attachments(trac, pages):
+    '''
+    Lists the attachments of all pages with batched MultiCalls
+    @returns list of (page, attachment)
+    '''
+    attachments = []
+    for start in range(0, len(pages), LISTING_BATCH_SIZE):
+        batch = pages[start:start + LISTING_BATCH_SIZE]
+        get_listings = xmlrpc.client.MultiCall(trac)
+        for page in batch:
+            get_listings.wiki.listAttachments(page)
+        for page, listing in zip(batch, get_listings()):
+            attachments.extend((page, a) for a in listing)
+    return attachments
+
 
-    for page in trac.wiki.getAllPages():
-        for a in trac.wiki.listAttachments(page):
-            print(page, '->', a)
-            attachment = trac.wiki.getAttachment(a)
+class AttachmentStore(object):
+    '''
+    Content addressed store of the attachments in OUTPUT_DIRECTORY.
+    Every distinct content is kept once in OBJECTS_DIRECTORY/<sha256> and the
+    attachment files are hard links to it. The manifest keeps size and hash of
+    every attachment downloaded, to skip them in the next runs.
+    '''
 
-            print(type(attachment))
+    def __init__(self, directory):
+        self.directory = directory
+        self.objects_directory = os.path.join(directory, OBJECTS_DIRECTORY)
+        os.makedirs(self.objects_directory, exist_ok=True)
+        self.manifest_filename = os.path.join(directory, MANIFEST_FILENAME)
+        self.lock = threading.Lock()
+        # attachment : {'size': n, 'sha256': hex}
+        self.manifest = {}
+        if os.path.isfile(self.manifest_filename):
+            with open(self.manifest_filename) as f:
+                self.manifest = json.load(f)
+
+    def is_up_to_date(self, attachment, filename, size):
+        ''' True if the local file has the remote size and the hash downloaded '''
+        entry = self.manifest.get(attachment)
+        if entry is None or size is None or entry['size'] != size:
+            return False
+        if not os.path.isfile(filename) or os.path.getsize(filename) != size:
+            return False
+        return file_sha256(filename) == entry['sha256']
+
+    def new_temporary_file(self):
+        ''' Temporary file in the same file system as the objects '''
+        return tempfile.NamedTemporaryFile(
+            dir=self.objects_directory, prefix='.download-', delete=False)
+
+    def add(self, attachment, filename, temporary_filename, sha256, size):
+        '''
+        Moves the downloaded file to the objects (unless the content is
+        there already) and links the attachment filename to it
+        @returns True if the content was new
+        '''
+        object_filename = os.path.join(self.objects_directory, sha256)
+        with self.lock:
+            is_new = not os.path.exists(object_filename)
+            if is_new:
+                os.replace(temporary_filename, object_filename)
+            else:
+                os.remove(temporary_filename)
+            if os.path.lexists(filename):
+                os.remove(filename)
+            try:
+                os.link(object_filename, filename)
+            except OSError:
+                # File system without hard links
+                shutil.copyfile(object_filename, filename)
+            self.manifest[attachment] = {'size': size, 'sha256': sha256}
+        return is_new
+
+    def save(self):
+        ''' Writes the manifest '''
+        with self.lock:
+            temporary_filename = self.manifest_filename + '.tmp'
+            with open(temporary_filename, 'w') as f:
+                json.dump(self.manifest, f, indent=1, sort_keys=True)
+            os.replace(temporary_filename, self.manifest_filename)
+
+
+def stream_attachment(attachment, temporary_file, sha256):
+    ''' Writes the attachment from the raw-attachment endpoint in chunks
+    @returns the number of bytes written '''
+    written = 0
+    with urllib.request.urlopen(raw_attachment_request(attachment)) as response:
+        for chunk in iter(lambda: response.read(CHUNK_SIZE), b''):
+            sha256.update(chunk)
+            temporary_file.write(chunk)
+            written += len(chunk)
+    return written
+
+
+def download_attachment(page, attachment, store):
+    '''
+    Downloads a single attachment to the store.
+    Attachments bigger than STREAM_THRESHOLD are streamed in chunks from the
+    raw-attachment endpoint, the others (or if raw-attachment is not
+    accessible) come from wiki.getAttachment.
+    Downloads with a size different from the advertised one fail.
+    @returns 'skipped', 'linked' (content already in the store), 'downloaded'
+    or 'failed'
+    '''
+    filename = attachment_filename(attachment)
+    temporary_file = None
+    try:
+        size = get_remote_size(attachment)
+        if store.is_up_to_date(attachment, filename, size):
+            print("Up to date: {}".format(filename))
+            return 'skipped'
+
+        print(page, '->', attachment)
+        sha256 = hashlib.sha256()
+        written = None
+        temporary_file = store.new_temporary_file()
+        with temporary_file:
+            if size is not None and size > STREAM_THRESHOLD:
+                try:
+                    written = stream_attachment(attachment, temporary_file, sha256)
+                except urllib.error.HTTPError as e:
+                    print("!! raw-attachment failed for {}: {}. "
+                          "Using wiki.getAttachment".format(attachment, e))
+                    sha256 = hashlib.sha256()
+                    temporary_file.seek(0)
+                    temporary_file.truncate()
+            if written is None:
+                data = get_trac().wiki.getAttachment(attachment).data
+                sha256.update(data)
+                temporary_file.write(data)
+                written = len(data)
+        if size is not None and written != size:
+            print("!! Failed to download {}: got {} of {} bytes".format(
+                attachment, written, size))
+            return 'failed'
+
+        # Without the remote size the download is the only way to compare
+        if size is None and store.is_up_to_date(attachment, filename, written) \
+                and store.manifest[attachment]['sha256'] == sha256.hexdigest():
+            print("Up to date: {}".format(filename))
+            return 'skipped'
+
+        print("Saving: {}".format(filename))
+        is_new = store.add(attachment, filename, temporary_file.name,
+                           sha256.hexdigest(), written)
+        return 'downloaded' if is_new else 'linked'
+    except (xmlrpc.client.Error, http.client.HTTPException, OSError) as e:
+        print("!! Failed to download {}: {}".format(attachment, e))
+        return 'failed'
+    finally:
+        # Left when the download failed or was not needed
+        if temporary_file is not None and os.path.exists(temporary_file.name):
+            os.remove(temporary_file.name)
+
+
+def main():
 
-            filename = f'{a}'.lstrip('/')
-            filename = filename.replace('/', '_')
-            filename = os.path.join("attachs", filename)
+    trac = get_trac()
+    pages = list(trac.wiki.getAllPages())
+    attachments = list_all_attachments(trac, pages)
+    print("Found {} attachments in {} pages.".format(len(attachments), len(pages)))
 
-            print("Saving: {}".format(filename))
-            dir = os.path.dirname(filename)
-            dir and os.makedirs(dir, exist_ok=True)
+    store = AttachmentStore(OUTPUT_DIRECTORY)
+    try:
+        with ThreadPool(NUMBER_OF_WORKERS) as p:
+            results = p.starmap(
+                download_attachment,
+                [(page, a, store) for page, a in attachments])
+    finally:
+        store.save()
 
-            with open(filename, 'wb') as f:
-                f.write(attachment.data)
+    print("Attachments: {}".format(dict(Counter(results))))
 
 
 __name__ == '__main__' and main()
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import json
+import re
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+'''
+Local stand-in for the parts of the GitHub REST API used by PyGithub in the
+migration scripts: organisations, repositories, milestones, labels, issues
+and issue comments. Repositories are created on first access.
+
+The latency and the (primary) rate limit are configurable. When the limit is
+exceeded the server answers 403 with the X-RateLimit-* headers, as GitHub does,
+and PyGithub sleeps until X-RateLimit-Reset (the end of the window).
+'''
+
+DEFAULT_PER_PAGE = 30
+MAX_PER_PAGE = 100
+CREATED_AT = "2020-01-01T00:00:00Z"
+
+ROUTES = []
+
+
+def route(method, pattern):
+    ''' Registers a handler of the FakeGitHub for method and path regex '''
+    def decorator(function):
+        ROUTES.append((method, re.compile(pattern + '$'), function.__name__))
+        return function
+    return decorator
+
+
+class _RequestHandler(BaseHTTPRequestHandler):
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately: avoid delayed ACK stalls
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+    def do_PATCH(self):
+        self._handle('PATCH')
+
+    def do_DELETE(self):
+        self._handle('DELETE')
+
+    def _handle(self, method):
+        fake = self.server.fake
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length) or b'null') if length else None
+        split = urllib.parse.urlsplit(self.path)
+        query = dict(urllib.parse.parse_qsl(split.query))
+        status, data, headers = fake.handle(method, split.path, query, body)
+        payload = json.dumps(data).encode('utf-8') if data is not None else b''
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        for k, v in headers.items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeGitHub(object):
+    '''
+    Fake GitHub server running in a background thread.
+
+    @param latency : seconds added to every request
+    @param rate_limit : requests allowed per rate_limit_window seconds,
+        None for no limit
+    '''
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0,
+                 rate_limit=None, rate_limit_window=10.0):
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.rate_limit_window = rate_limit_window
+        self.lock = threading.Lock()
+        # repo name : {'milestones': [], 'labels': {}, 'issues': [], 'comments': 0}
+        self.repos = {}
+        self.requests = 0
+        self.calls = Counter()
+        self.rate_limited = 0
+        self.window_start = time.time()
+        self.window_requests = 0
+
+        self.server = ThreadingHTTPServer((host, port), _RequestHandler)
+        self.server.daemon_threads = True
+        self.server.fake = self
+        self.thread = None
+
+    @property
+    def url(self):
+        ''' GITHUB-API-URL of the server '''
+        host, port = self.server.server_address[:2]
+        return 'http://{}:{}'.format(host, port)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_counters(self):
+        with self.lock:
+            self.requests = 0
+            self.calls = Counter()
+            self.rate_limited = 0
+
+    def handle(self, method, path, query, body):
+        '''
+        Dispatches a request
+        @returns (status, json data, headers)
+        '''
+        self.latency and time.sleep(self.latency)
+        with self.lock:
+            self.requests += 1
+            headers = {}
+            if self.rate_limit is not None:
+                status, data = self._check_rate_limit(headers)
+                if status != 200:
+                    return status, data, headers
+
+        for route_method, pattern, name in ROUTES:
+            match = pattern.match(path)
+            if route_method == method and match:
+                with self.lock:
+                    self.calls['{} {}'.format(method, name)] += 1
+                    result = getattr(self, name)(
+                        query, body, *map(urllib.parse.unquote, match.groups()))
+                if len(result) == 3:
+                    status, data, extra_headers = result
+                    headers.update(extra_headers)
+                else:
+                    status, data = result
+                return status, data, headers
+        return 404, {'message': 'Not Found'}, headers
+
+    def _check_rate_limit(self, headers):
+        ''' Counts the request in the window and fills the X-RateLimit-* headers '''
+        now = time.time()
+        if now - self.window_start >= self.rate_limit_window:
+            self.window_start = now
+            self.window_requests = 0
+        headers.update({
+            'X-RateLimit-Limit': str(self.rate_limit),
+            'X-RateLimit-Reset': str(
+                int(self.window_start + self.rate_limit_window) + 1),
+            'X-RateLimit-Resource': 'core',
+        })
+        if self.window_requests >= self.rate_limit:
+            self.rate_limited += 1
+            headers['X-RateLimit-Remaining'] = '0'
+            headers['X-RateLimit-Used'] = str(self.window_requests)
+            return 403, {
+                'message': 'API rate limit exceeded for user.',
+                'documentation_url': 'https://docs.github.com/rest/overview/resources-in-the-rest-api#rate-limiting',
+            }
+        self.window_requests += 1
+        headers['X-RateLimit-Remaining'] = str(
+            self.rate_limit - self.window_requests)
+        headers['X-RateLimit-Used'] = str(self.window_requests)
+        return 200, None
+
+    # JSON objects
+
+    def _repo(self, org, repo_name):
+        return self.repos.setdefault(repo_name, {
+            'org': org, 'milestones': [], 'labels': {}, 'issues': [],
+            'comments': 0})
+
+    def _user_json(self, login):
+        return {'login': login, 'id': abs(hash(login)) % 10 ** 8,
+                'url': '{}/users/{}'.format(self.url, login), 'type': 'User'}
+
+    def _repo_url(self, org, repo_name):
+        return '{}/repos/{}/{}'.format(self.url, org, repo_name)
+
+    def _label_json(self, org, repo_name, name, color):
+        return {'id': abs(hash((repo_name, name))) % 10 ** 8, 'name': name,
+                'color': color, 'default': False, 'description': None,
+                'url': '{}/labels/{}'.format(
+                    self._repo_url(org, repo_name), urllib.parse.quote(name))}
+
+    def _paginated(self, path, query, items):
+        ''' One page of items with the Link header of the next one '''
+        per_page = min(int(query.get('per_page', DEFAULT_PER_PAGE)), MAX_PER_PAGE)
+        page = int(query.get('page', 1))
+        start = (page - 1) * per_page
+        headers = {}
+        if start + per_page < len(items):
+            next_query = dict(query, page=str(page + 1))
+            headers['Link'] = '<{}{}?{}>; rel="next"'.format(
+                self.url, path, urllib.parse.urlencode(next_query))
+        return 200, items[start:start + per_page], headers
+
+    # Routes: (query, body, *path groups) -> (status, data[, headers])
+
+    @route('GET', r'/orgs/([^/]+)')
+    def get_org(self, query, body, org):
+        return 200, {'login': org, 'id': 1, 'type': 'Organization',
+                     'url': '{}/orgs/{}'.format(self.url, org)}
+
+    @route('GET', r'/repos/([^/]+)/([^/]+)')
+    def get_repo(self, query, body, org, repo_name):
+        self._repo(org, repo_name)
+        return 200, {'id': abs(hash(repo_name)) % 10 ** 8, 'name': repo_name,
+                     'full_name': '{}/{}'.format(org, repo_name),
+                     'owner': {'login': org, 'type': 'Organization'},
+                     'url': self._repo_url(org, repo_name)}
+
+    @route('GET', r'/repos/([^/]+)/([^/]+)/milestones')
+    def get_milestones(self, query, body, org, repo_name):
+        milestones = self._repo(org, repo_name)['milestones']
+        return self._paginated(
+            '/repos/{}/{}/milestones'.format(org, repo_name), query, milestones)
+
+    @route('POST', r'/repos/([^/]+)/([^/]+)/milestones')
+    def create_milestone(self, query, body, org, repo_name):
+        milestones = self._repo(org, repo_name)['milestones']
+        number = len(milestones) + 1
+        milestone = {
+            'id': number, 'number': number, 'title': body['title'],
+            'state': body.get('state', 'open'),
+            'description': body.get('description'),
+            'open_issues': 0, 'closed_issues': 0, 'created_at': CREATED_AT,
+            'url': '{}/milestones/{}'.format(
+                self._repo_url(org, repo_name), number)}
+        milestones.append(milestone)
+        return 201, milestone
+
+    @route('GET', r'/repos/([^/]+)/([^/]+)/labels')
+    def get_labels(self, query, body, org, repo_name):
+        labels = list(self._repo(org, repo_name)['labels'].values())
+        return self._paginated(
+            '/repos/{}/{}/labels'.format(org, repo_name), query, labels)
+
+    @route('POST', r'/repos/([^/]+)/([^/]+)/labels')
+    def create_label(self, query, body, org, repo_name):
+        labels = self._repo(org, repo_name)['labels']
+        if body['name'] in labels:
+            return 422, {'message': 'Validation Failed'}
+        labels[body['name']] = self._label_json(
+            org, repo_name, body['name'], body.get('color', 'FFFFFF'))
+        return 201, labels[body['name']]
+
+    @route('GET', r'/repos/([^/]+)/([^/]+)/issues')
+    def get_issues(self, query, body, org, repo_name):
+        issues = self._repo(org, repo_name)['issues']
+        state = query.get('state', 'open')
+        if state != 'all':
+            issues = [i for i in issues if i['state'] == state]
+        return self._paginated(
+            '/repos/{}/{}/issues'.format(org, repo_name), query, issues)
+
+    @route('POST', r'/repos/([^/]+)/([^/]+)/issues')
+    def create_issue(self, query, body, org, repo_name):
+        repo = self._repo(org, repo_name)
+        number = len(repo['issues']) + 1
+        issue = {
+            'id': number, 'number': number, 'title': body['title'],
+            'body': body.get('body'), 'state': 'open', 'labels': [],
+            'assignee': None, 'assignees': [], 'milestone': None,
+            'comments': 0, 'user': self._user_json('sasview-bot'),
+            'created_at': CREATED_AT, 'updated_at': CREATED_AT,
+            'closed_at': None,
+            'url': '{}/issues/{}'.format(self._repo_url(org, repo_name), number),
+            'repository_url': self._repo_url(org, repo_name)}
+        repo['issues'].append(issue)
+        self._update_issue(org, repo_name, issue, body)
+        return 201, issue
+
+    def _update_issue(self, org, repo_name, issue, body):
+        repo = self._repo(org, repo_name)
+        for field in ('title', 'body', 'state'):
+            if field in body:
+                issue[field] = body[field]
+        if 'assignee' in body:
+            issue['assignee'] = self._user_json(body['assignee']) \
+                if body['assignee'] else None
+            issue['assignees'] = [issue['assignee']] if issue['assignee'] else []
+        if body.get('milestone'):
+            issue['milestone'] = repo['milestones'][body['milestone'] - 1]
+        if 'labels' in body:
+            issue['labels'] = [
+                repo['labels'].get(name) or self._label_json(
+                    org, repo_name, name, 'FFFFFF')
+                for name in body['labels']]
+
+    @route('GET', r'/repos/([^/]+)/([^/]+)/issues/(\d+)')
+    def get_issue(self, query, body, org, repo_name, number):
+        issues = self._repo(org, repo_name)['issues']
+        if not 0 < int(number) <= len(issues):
+            return 404, {'message': 'Not Found'}
+        return 200, issues[int(number) - 1]
+
+    @route('PATCH', r'/repos/([^/]+)/([^/]+)/issues/(\d+)')
+    def edit_issue(self, query, body, org, repo_name, number):
+        status, issue = self.get_issue(query, body, org, repo_name, number)
+        if status == 200:
+            self._update_issue(org, repo_name, issue, body)
+        return status, issue
+
+    @route('DELETE', r'/repos/([^/]+)/([^/]+)/issues/(\d+)/labels/([^/]+)')
+    def remove_label(self, query, body, org, repo_name, number, label):
+        status, issue = self.get_issue(query, body, org, repo_name, number)
+        if status != 200:
+            return status, issue
+        issue['labels'] = [i for i in issue['labels'] if i['name'] != label]
+        return 200, issue['labels']
+
+    @route('POST', r'/repos/([^/]+)/([^/]+)/issues/(\d+)/comments')
+    def create_comment(self, query, body, org, repo_name, number):
+        status, issue = self.get_issue(query, body, org, repo_name, number)
+        if status != 200:
+            return status, issue
+        repo = self._repo(org, repo_name)
+        repo['comments'] += 1
+        issue['comments'] += 1
+        return 201, {
+            'id': repo['comments'], 'body': body['body'],
+            'user': self._user_json('sasview-bot'),
+            'created_at': CREATED_AT, 'updated_at': CREATED_AT,
+            'url': '{}/issues/comments/{}'.format(
+                self._repo_url(org, repo_name), repo['comments']),
+            'issue_url': issue['url']}
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import socketserver
+import threading
+import time
+import urllib.parse
+from collections import Counter
+from xmlrpc.client import Binary, Fault
+from xmlrpc.server import SimpleXMLRPCRequestHandler, SimpleXMLRPCServer
+
+'''
+Local stand-in for the Trac XML-RPC API of trac.sasview.org, filled from a
+synthetic_corpus.Corpus.
+
+Implements ticket.query/get/changeLog, wiki.getAllPages/getPageHTML/
+listAttachments/getAttachment, system.multicall and the raw-attachment
+endpoint. Credentials are accepted but not checked.
+'''
+
+CHUNK_SIZE = 64 * 1024
+
+
+class _RequestHandler(SimpleXMLRPCRequestHandler):
+    ''' XML-RPC on the paths used by the scripts, GET/HEAD for attachments '''
+
+    rpc_paths = ('/rpc', '/xmlrpc', '/login/rpc', '/login/xmlrpc')
+
+    def do_POST(self):
+        self.server.fake.count_request()
+        self.server.fake.latency and time.sleep(self.server.fake.latency)
+        super().do_POST()
+
+    def do_GET(self):
+        self._send_attachment(send_body=True)
+
+    def do_HEAD(self):
+        self._send_attachment(send_body=False)
+
+    def _send_attachment(self, send_body):
+        self.server.fake.count_request()
+        self.server.fake.count_call('HTTP raw-attachment')
+        self.server.fake.latency and time.sleep(self.server.fake.latency)
+        path = urllib.parse.unquote(urllib.parse.urlsplit(self.path).path)
+        content = None
+        for prefix in ('/raw-attachment/wiki/', '/login/raw-attachment/wiki/'):
+            if path.startswith(prefix):
+                content = self.server.fake.corpus.attachment_content(
+                    path[len(prefix):])
+        if content is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        if send_body:
+            for start in range(0, len(content), CHUNK_SIZE):
+                self.wfile.write(content[start:start + CHUNK_SIZE])
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _ThreadingXMLRPCServer(socketserver.ThreadingMixIn, SimpleXMLRPCServer):
+    daemon_threads = True
+
+
+class FakeTrac(object):
+    '''
+    Fake Trac server running in a background thread.
+
+    @param corpus : synthetic_corpus.Corpus
+    @param latency : seconds added to every HTTP request
+    '''
+
+    def __init__(self, corpus, host='127.0.0.1', port=0, latency=0.0):
+        self.corpus = corpus
+        self.latency = latency
+        self.lock = threading.Lock()
+        # HTTP requests and method calls (inside multicalls as well)
+        self.requests = 0
+        self.calls = Counter()
+
+        self.server = _ThreadingXMLRPCServer(
+            (host, port), requestHandler=_RequestHandler, logRequests=False,
+            allow_none=True)
+        self.server.fake = self
+        self.server.register_multicall_functions()
+        for name, function in [
+                ('ticket.query', self.ticket_query),
+                ('ticket.get', self.ticket_get),
+                ('ticket.changeLog', self.ticket_change_log),
+                ('wiki.getAllPages', self.wiki_get_all_pages),
+                ('wiki.getPageHTML', self.wiki_get_page_html),
+                ('wiki.listAttachments', self.wiki_list_attachments),
+                ('wiki.getAttachment', self.wiki_get_attachment)]:
+            self.server.register_function(self._counted(name, function), name)
+        self.thread = None
+
+    @property
+    def url(self):
+        ''' TRAC-URL of the server '''
+        host, port = self.server.server_address[:2]
+        return 'http://USERNAME:PASSWORD@{}:{}'.format(host, port)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever,
+                                       daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset_counters(self):
+        with self.lock:
+            self.requests = 0
+            self.calls = Counter()
+
+    def count_request(self):
+        with self.lock:
+            self.requests += 1
+
+    def count_call(self, name):
+        with self.lock:
+            self.calls[name] += 1
+
+    def _counted(self, name, function):
+        def counted(*args):
+            self.count_call(name)
+            return function(*args)
+        return counted
+
+    # XML-RPC methods
+
+    def ticket_query(self, query='status!=closed'):
+        return self.corpus.query(query)
+
+    def ticket_get(self, trac_id):
+        if trac_id not in self.corpus.tickets:
+            raise Fault(404, 'Ticket {} does not exist.'.format(trac_id))
+        time_created, time_changed, attributes = self.corpus.tickets[trac_id]
+        return [trac_id, time_created, time_changed, attributes]
+
+    def ticket_change_log(self, trac_id, when=0):
+        if trac_id not in self.corpus.tickets:
+            raise Fault(404, 'Ticket {} does not exist.'.format(trac_id))
+        return self.corpus.changelog(trac_id)
+
+    def wiki_get_all_pages(self):
+        return list(self.corpus.pages)
+
+    def wiki_get_page_html(self, page, version=None):
+        if page not in self.corpus.pages:
+            raise Fault(404, 'Wiki page "{}" does not exist'.format(page))
+        return self.corpus.page_html(page)
+
+    def wiki_list_attachments(self, page):
+        return [a for a, _, _ in self.corpus.pages.get(page, [])]
+
+    def wiki_get_attachment(self, attachment):
+        content = self.corpus.attachment_content(attachment)
+        if content is None:
+            raise Fault(404, 'Attachment "{}" does not exist'.format(attachment))
+        return Binary(content)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+import os
+
+'''
+Single entry point of the Trac to GitHub migration:
+
+  python migrate.py issues        # trac tickets -> github issues
+  python migrate.py wiki          # trac wiki -> github wiki
+  python migrate.py attachments   # downloads the wiki attachments
+
+The scripts (and PyGithub, bs4, bleach...) are only imported by the
+subcommand that runs them.
+'''
+
+
+def issues(args):
+    import migration_issues
+    migration_issues.Migrator().run()
+
+
+def wiki(args):
+    import export_wiki
+    if args.output_directory:
+        export_wiki.OUTPUT_DIRECTORY = os.path.abspath(args.output_directory)
+    if args.no_publish:
+        export_wiki.export_pages()
+    else:
+        export_wiki.main()
+
+
+def attachments(args):
+    import export_wiki_attachments
+    if args.output_directory:
+        export_wiki_attachments.OUTPUT_DIRECTORY = args.output_directory
+    if args.workers:
+        export_wiki_attachments.NUMBER_OF_WORKERS = args.workers
+    export_wiki_attachments.main()
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description='Migrates the SasView trac to github')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    p = subparsers.add_parser('issues', help='migrate trac tickets to github issues')
+    p.set_defaults(function=issues)
+
+    p = subparsers.add_parser('wiki', help='migrate the trac wiki to github')
+    p.add_argument('--output-directory', help='where the HTML pages are saved')
+    p.add_argument('--no-publish', action='store_true',
+                   help='only save the HTML pages, do not convert and push them')
+    p.set_defaults(function=wiki)
+
+    p = subparsers.add_parser('attachments', help='download the wiki attachments')
+    p.add_argument('--output-directory', help='where the attachments are saved')
+    p.add_argument('--workers', type=int,
+                   help='number of attachments downloaded at the same time')
+    p.set_defaults(function=attachments)
+
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    args.function(args)
+
+
+if __name__ == "__main__":
+    main()
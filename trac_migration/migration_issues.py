@@ -9,10 +9,10 @@ from itertools import chain
 from pprint import pprint
 from time import mktime
 from urllib.parse import urljoin, urlsplit, urlunsplit
-from xmlrpc.client import MultiCall, ServerProxy
+from xmlrpc.client import MultiCall
 
-from dotenv import load_dotenv
-from github import Github, GithubObject
+from connections import (DEFAULT_GITHUB_USERNAME, get_github_organisation,
+                         get_trac)
 
 '''
 Adapted from:
@@ -30,8 +30,6 @@ GITHUB_REPO_TRAC_QUERY_MAP = {
     #"temp2": "max=0&order=id&id=1242&or&id=1243&or&id=1244",
 }
 
-DEFAULT_GITHUB_USERNAME = "sasview-bot"
-
 # Usernames map :: trac:github
 USERNAME_MAP = {
     'Adamo': 'marcoadamo1',
@@ -123,17 +121,10 @@ class Migrator(object):
 
     def __init__(self, *args, **kwargs):
 
-        # load .env file
-        load_dotenv()
-
         # TRAC
         trac_url = os.getenv("TRAC-URL")
         self.trac_public_url = remove_credentials_from_url(trac_url)
-        trac_api_url = urljoin(trac_url, "/login/rpc")
-        self.trac = ServerProxy(trac_api_url)
-        
-        # GITHUB
-        self.GITHUB_TOKENS = eval(os.getenv("GITHUB-TOKENS"))
+        self.trac = get_trac()
 
         # Member variables
         # repo : track ticket number : gh issue obj
@@ -151,12 +142,7 @@ class Migrator(object):
         ''' authenticate github based on token given a user name
         @returns a gh repo object authenticated
         '''
-        github_username = github_username.strip()
-        if github_username not in self.GITHUB_TOKENS:
-            github_username = DEFAULT_GITHUB_USERNAME
-        token = self.GITHUB_TOKENS[github_username]
-        github = Github(token)
-        github_org = github.get_organization(os.getenv("GITHUB-ORGANISATION"))
+        github_org = get_github_organisation(github_username)
         github_repo = github_org.get_repo(repo_name)
         return github_repo
 
@@ -238,6 +224,7 @@ class Migrator(object):
                 self.gh_milestones[repo_name][m.title] = m
             return self.gh_milestones[repo_name][milestone]
         else:
+            from github import GithubObject
             return GithubObject.NotSet
 
     def get_gh_label(self, label, repo_name):
@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import random
+import zlib
+from datetime import datetime, timedelta
+from xmlrpc.client import DateTime
+
+'''
+Synthetic Trac corpus (tickets, changelogs, wiki pages and attachments) used
+to fill the fake Trac and GitHub servers.
+
+Only the ticket attributes are kept in memory: changelogs, page HTML and
+attachment contents are generated on demand from the seed, so the corpus can
+grow to tens of thousands of tickets and pages.
+'''
+
+# Same components as trac.sasview.org, so the queries of
+# migration_issues.GITHUB_REPO_TRAC_QUERY_MAP split the tickets between repos
+COMPONENTS = ['SasView', 'SansView', 'sasmodels', 'sasmodels Marketplace',
+              'docs']
+
+TRAC_USERNAMES = ['butler', 'pkienzle', 'krzywon', 'smk78', 'richardh',
+                  'wojciech', 'piotr', 'ajj', 'lewis', 'mathieu', 'davidm',
+                  'unknown user']
+
+MILESTONES = ['', 'SasView 4.0.0', 'SasView 4.1.0', 'SasView 4.2.0',
+              'SasView 5.0.0', 'sasmodels 1.0', 'Admin Tasks']
+
+TYPES = ['defect', 'enhancement', 'task']
+
+PRIORITIES = ['trivial', 'minor', 'major', 'critical', 'blocker']
+
+WORKPACKAGES = ['', 'SasView Bug Fixing', 'Documentation', 'Infrastructure']
+
+WORDS = ('sasview model fit data plot slit smearing resolution guinier '
+         'porod loader saveload perspective inversion batch polydispersity '
+         'magnetic orientation sphere cylinder ellipsoid form factor '
+         'structure manager window crash error fails python install').split()
+
+START_TIME = datetime(2010, 1, 1)
+
+
+class Corpus(object):
+    '''
+    Deterministic synthetic corpus.
+
+    @param tickets : number of tickets
+    @param pages : number of wiki pages
+    @param changes_per_ticket : mean number of changelog entries per ticket
+    @param attachments_per_page : mean number of attachments per page
+    @param duplicate_ratio : fraction of attachments with the same content
+        as an attachment of another page
+    @param large_ratio : fraction of attachments of large_size
+    '''
+
+    def __init__(self, tickets=1000, pages=200, changes_per_ticket=4,
+                 attachments_per_page=1, duplicate_ratio=0.2,
+                 large_ratio=0.05, small_size=16 * 1024,
+                 large_size=4 * 1024 * 1024, seed=0):
+        self.changes_per_ticket = changes_per_ticket
+        self.seed = seed
+        rng = random.Random(seed)
+
+        # ticket id : [time_created, time_changed, attributes]
+        self.tickets = {}
+        for trac_id in range(1, tickets + 1):
+            created = START_TIME + timedelta(hours=trac_id)
+            changed = created + timedelta(days=rng.randint(0, 400))
+            summary = self._sentence(rng, 4, 9)
+            attributes = {
+                'summary': summary.capitalize(),
+                'description': self._description(rng, tickets),
+                'component': rng.choice(COMPONENTS),
+                'milestone': rng.choice(MILESTONES),
+                'owner': rng.choice(TRAC_USERNAMES + ['']),
+                'reporter': rng.choice(TRAC_USERNAMES),
+                'status': rng.choice(['new', 'assigned', 'closed', 'closed']),
+                'type': rng.choice(TYPES),
+                'priority': rng.choice(PRIORITIES),
+                'workpackage': rng.choice(WORKPACKAGES),
+                'time': DateTime(created),
+                'changetime': DateTime(changed),
+            }
+            self.tickets[trac_id] = [DateTime(created), DateTime(changed),
+                                     attributes]
+
+        # page name : [(attachment, size, content seed)]
+        self.pages = {}
+        contents = []
+        for n in range(pages):
+            if n == 0:
+                page = 'WikiStart'
+            elif n % 5 == 0:
+                page = 'Tutorials/Page{:05d}'.format(n)
+            else:
+                page = 'Page{:05d}'.format(n)
+            attachments = []
+            for i in range(self._poisson(rng, attachments_per_page)):
+                if contents and rng.random() < duplicate_ratio:
+                    size, content_seed = rng.choice(contents)
+                else:
+                    size = large_size if rng.random() < large_ratio \
+                        else rng.randint(small_size // 2, small_size * 2)
+                    content_seed = rng.getrandbits(32)
+                    contents.append((size, content_seed))
+                extension = rng.choice(['png', 'pdf', 'txt', 'zip'])
+                attachments.append(
+                    ('{}/file{:02d}.{}'.format(page, i, extension),
+                     size, content_seed))
+            self.pages[page] = attachments
+
+        # attachment : (size, content seed)
+        self.attachments = {a: (size, content_seed)
+                            for attachments in self.pages.values()
+                            for a, size, content_seed in attachments}
+
+    @staticmethod
+    def _poisson(rng, mean):
+        ''' Small Poisson-like integer around mean '''
+        return sum(1 for _ in range(int(mean * 2)) if rng.random() < 0.5)
+
+    @staticmethod
+    def _sentence(rng, min_words, max_words):
+        return ' '.join(rng.choice(WORDS)
+                        for _ in range(rng.randint(min_words, max_words)))
+
+    def _description(self, rng, number_of_tickets):
+        ''' Ticket text with wiki syntax and references to other tickets '''
+        return '{}. See #{} and refs #{}.[[BR]]\n{{{{{{\n{}\n}}}}}}\n{}'.format(
+            self._sentence(rng, 10, 40).capitalize(),
+            rng.randint(1, number_of_tickets),
+            rng.randint(1, number_of_tickets),
+            self._sentence(rng, 3, 8),
+            self._sentence(rng, 10, 40))
+
+    def _rng(self, *key):
+        ''' Random generator only dependent on the seed and key '''
+        return random.Random(zlib.crc32(repr((self.seed,) + key).encode()))
+
+    def query(self, query):
+        '''
+        Ticket ids matching a Trac query string as the ones of
+        migration_issues.GITHUB_REPO_TRAC_QUERY_MAP:
+        'field=a&field=b' matches a or b, 'field=!a&field=!b' (or
+        'field!=a&field!=b') neither of them and '&or&' joins alternative
+        clauses. max and order are ignored.
+        '''
+        clauses = []
+        for clause in query.split('&or&'):
+            # field : (values, excluded values)
+            constraints = {}
+            for constraint in clause.split('&'):
+                if '=' not in constraint:
+                    continue
+                field, value = constraint.split('=', 1)
+                if field in ('max', 'order', 'desc', 'page', 'col'):
+                    continue
+                value = value.replace('%20', ' ')
+                if field.endswith('!'):
+                    field, value = field[:-1], '!' + value
+                included, excluded = constraints.setdefault(field, (set(), set()))
+                if value.startswith('!'):
+                    excluded.add(value[1:])
+                else:
+                    included.add(value)
+            clauses.append(constraints)
+
+        def matches(trac_id, attributes, constraints):
+            for field, (included, excluded) in constraints.items():
+                value = str(trac_id) if field == 'id' else attributes.get(field, '')
+                if included and value not in included:
+                    return False
+                if value in excluded:
+                    return False
+            return True
+
+        return [trac_id for trac_id, (_, _, attributes) in self.tickets.items()
+                if any(matches(trac_id, attributes, c) for c in clauses)]
+
+    def changelog(self, trac_id):
+        ''' [(time, author, field, old value, new value, permanent)] '''
+        rng = self._rng('changelog', trac_id)
+        time_created, _, attributes = self.tickets[trac_id]
+        time = datetime.strptime(time_created.value, "%Y%m%dT%H:%M:%S")
+        changelog = []
+        for _ in range(self._poisson(rng, self.changes_per_ticket)):
+            time += timedelta(hours=rng.randint(1, 500))
+            author = rng.choice(TRAC_USERNAMES)
+            kind = rng.random()
+            if kind < 0.6:
+                changelog.append([DateTime(time), author, 'comment', '',
+                                  self._sentence(rng, 5, 60), 1])
+            elif kind < 0.8:
+                changelog.append([DateTime(time), author, 'priority',
+                                  attributes['priority'],
+                                  rng.choice(PRIORITIES), 1])
+            else:
+                changelog.append([DateTime(time), author, 'description',
+                                  self._sentence(rng, 5, 20),
+                                  attributes['description'], 1])
+        return changelog
+
+    def page_html(self, page):
+        ''' HTML of a wiki page, linking tickets, pages and attachments '''
+        rng = self._rng('page', page)
+        names = list(self.pages)
+        paragraphs = ['<h1>{}</h1>'.format(page)]
+        for _ in range(rng.randint(3, 12)):
+            trac_id = rng.randint(1, max(len(self.tickets), 1))
+            paragraphs.append(
+                '<p>{} <a class="ticket" href="http://trac.sasview.org/ticket/{}">'
+                '#{}</a> {} <a class="wiki" href="http://trac.sasview.org/wiki/{}">'
+                'link</a></p>'.format(
+                    self._sentence(rng, 10, 60), trac_id, trac_id,
+                    self._sentence(rng, 5, 30), rng.choice(names)))
+        for attachment, _, _ in self.pages[page]:
+            paragraphs.append(
+                '<img src="http://trac.sasview.org/raw-attachment/wiki/{}" />'.format(
+                    attachment))
+        paragraphs.append('<!-- comment -->')
+        return '<div class="wikipage">\n{}\n</div>'.format('\n'.join(paragraphs))
+
+    def attachment_content(self, attachment):
+        ''' bytes of an attachment or None if it doesn't exist '''
+        if attachment not in self.attachments:
+            return None
+        size, content_seed = self.attachments[attachment]
+        return random.Random(content_seed).randbytes(size)